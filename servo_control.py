@@ -1,9 +1,127 @@
+import array
+import copy
+import json
+import logging
+import os
+import queue
+import struct
+import sys
+import threading
 import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from enum import IntEnum
+
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+    import select
+    import termios
+    import tty
+
 import yaml
 import minimalmodbus
 
 JOG_STEP = 25  # Шаг изменения скорости в JOG режиме
 
+log = logging.getLogger("servo")
+
+# Кэш разобранных конфигураций: абсолютный путь -> (mtime_ns, размер, секция modbus)
+_CFG_CACHE = OrderedDict()
+_CFG_CACHE_SIZE = 16
+
+# Обязательные параметры секции modbus файла конфигурации
+_REQUIRED_CONFIG_KEYS = ("port", "slave_address", "baudrate", "bytesize", "parity", "stopbits", "timeout")
+
+# Разобранная конфигурация сохраняется рядом с YAML, чтобы при следующем запуске не парсить его
+_CFG_SIDECAR_SUFFIX = ".cache"
+
+
+def _read_config_sidecar(path, stat):
+    """Чтение сохраненной конфигурации, если она соответствует текущему YAML файлу"""
+    try:
+        with open(path + _CFG_SIDECAR_SUFFIX, "r", encoding="utf-8") as file:
+            sidecar = json.load(file)
+        if sidecar["mtime_ns"] == stat.st_mtime_ns and sidecar["size"] == stat.st_size:
+            return sidecar["modbus"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # Нет файла, он поврежден или устарел - просто разбираем YAML
+    return None
+
+
+def _write_config_sidecar(path, stat, modbus_config):
+    """Атомарное сохранение разобранной конфигурации рядом с YAML файлом"""
+    sidecar_path = path + _CFG_SIDECAR_SUFFIX
+    tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+    sidecar = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "modbus": modbus_config}
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(sidecar, file, ensure_ascii=False)
+        os.replace(tmp_path, sidecar_path)
+    except (OSError, TypeError, ValueError):
+        # Кэш необязателен: каталог только для чтения или значения не сериализуются в JSON
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _make_crc16_table():
+    """Таблица CRC-16/Modbus (полином 0xA001) на каждое значение байта"""
+    table = array.array("H")
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC16_TABLE = _make_crc16_table()
+
+
+def _crc16(data):
+    """CRC-16/Modbus по таблице: один шаг на байт вместо восьми"""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC16_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+# Заранее скомпилированные форматы RTU-кадра: адрес, FC6, регистр, значение и CRC
+_RTU_WRITE_SINGLE = struct.Struct(">BBHH")
+_RTU_CRC = struct.Struct("<H")
+
+
+# Коды исключений Modbus в ответе привода (функция | 0x80): код -> (исключение, описание)
+_SLAVE_EXCEPTIONS = {
+    1: (minimalmodbus.IllegalRequestError, "недопустимая функция"),
+    2: (minimalmodbus.IllegalRequestError, "недопустимый адрес регистра"),
+    3: (minimalmodbus.IllegalRequestError, "недопустимое значение"),
+    4: (minimalmodbus.SlaveReportedException, "сбой устройства"),
+    6: (minimalmodbus.SlaveDeviceBusyError, "устройство занято"),
+    7: (minimalmodbus.NegativeAcknowledgeError, "отрицательное подтверждение"),
+}
+
+
+def _build_write_frame(slave_address, register, value):
+    """Сборка RTU-кадра записи одного регистра (FC6) с CRC"""
+    frame = _RTU_WRITE_SINGLE.pack(slave_address, 6, register, value)
+    return frame + _RTU_CRC.pack(_crc16(frame))
+
+
+# Метка элемента очереди обмена: запись последней скорости из заявки
+_FLUSH_SPEED = "flush_speed"
+
+
+class Direction(IntEnum):
+    """Направление вращения в режиме JOG"""
+
+    STOP = 0
+    FORWARD = 1
+    REVERSE = 2
+
 
 class ServoController:
     """Класс для управления сервоприводом Delta ASDA-AB по Modbus RTU"""
@@ -24,142 +142,241 @@ class ServoController:
         "SPEED_MAX": 3000,  # Максимальная скорость
     }
 
+    # Команда JOG для каждого направления (индекс - значение Direction)
+    DIRECTION_COMMANDS = (JOG_COMMANDS["STOP"], JOG_COMMANDS["FORWARD"], JOG_COMMANDS["REVERSE"])
+    COMMAND_DIRECTIONS = {
+        JOG_COMMANDS["STOP"]: Direction.STOP,
+        JOG_COMMANDS["FORWARD"]: Direction.FORWARD,
+        JOG_COMMANDS["REVERSE"]: Direction.REVERSE,
+    }
+
+    # Справочная информация по основным кодам ошибок (P0-01)
+    ERROR_DESCRIPTIONS = {
+        1: "Перегрузка по току",
+        2: "Перенапряжение",
+        3: "Пониженное напряжение",
+        4: "Смещение Z-импульса",
+        5: "Ошибка рекуперации",
+        6: "Перегрузка",
+        7: "Превышение скорости",
+        8: "Некорректная команда импульсного управления",
+        9: "Чрезмерное отклонение",
+        10: "Ошибка watchdog",
+        13: "Активирован аварийный останов",
+        14: "Ошибка обратного предела",
+        15: "Ошибка прямого предела",
+        20: "Ошибка последовательной связи",
+        23: "Предупреждение о перегрузке",
+    }
+
+    __slots__ = (
+        "instrument",
+        "_port",
+        "_slave_address",
+        "_baudrate",
+        "_bytesize",
+        "_parity",
+        "_stopbits",
+        "_timeout",
+        "_resume_jog",
+        "current_speed",
+        "current_direction",
+        "_last_written",
+        "_jog_frames",
+        "_cmd_q",
+        "_worker",
+        "_bus_lock",
+        "_pending_speed",
+        "_pending_lock",
+    )
+
     def __init__(self, config_file="modbus_config.yaml"):
         """Инициализация контроллера с загрузкой конфигурации"""
         self.instrument = None
-        self.config = self._load_config(config_file)
+        config = self._load_config(config_file)
+        # Параметры связи не меняются после загрузки - разбираем их один раз.
+        # Отсутствующие параметры сообщит connect() вместе с подсказками по настройке
+        self._port = config.get("port")
+        self._slave_address = config.get("slave_address")
+        self._baudrate = config.get("baudrate")
+        self._bytesize = config.get("bytesize")
+        self._parity = config.get("parity")
+        self._stopbits = config.get("stopbits")
+        self._timeout = config.get("timeout")
+        # Повторять ли команду направления после записи скорости во время вращения
+        self._resume_jog = config.get("resume_jog_after_speed", True)
         self.current_speed = 20  # Начальная скорость в об/мин
-        self.current_direction = None  # None - остановлен, "forward" или "reverse"
+        self.current_direction = Direction.STOP
+        self._last_written = None  # Последнее известное значение регистра P4-05
+        self._jog_frames = {}  # Готовые RTU-кадры команд JOG: команда -> кадр
+        self._cmd_q = queue.SimpleQueue()  # Очередь записей для фонового потока обмена
+        self._worker = None
+        self._bus_lock = threading.Lock()  # Шина одна - обмен только из одного потока за раз
+        # Открытая заявка на смену скорости, уже стоящая в очереди:
+        # [скорость, кадр, направление на момент запроса] или None
+        self._pending_speed = None
+        self._pending_lock = threading.Lock()
 
     def _load_config(self, config_file):
-        """Загрузка конфигурации из YAML файла"""
+        """Загрузка конфигурации из YAML файла (с кэшем в памяти и на диске по mtime и размеру)"""
         try:
-            with open(config_file, "r") as file:
-                config = yaml.safe_load(file)
-                return config.get("modbus", {})
+            path = os.path.abspath(config_file)
+            stat = os.stat(path)
+
+            cached = _CFG_CACHE.get(path)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                _CFG_CACHE.move_to_end(path)
+                # Копия, чтобы изменения у одного контроллера не попали в кэш
+                return copy.deepcopy(cached[2])
+
+            modbus_config = _read_config_sidecar(path, stat)
+            if modbus_config is None:
+                with open(path, "r") as file:
+                    # C-парсер libyaml заметно быстрее; если PyYAML собран без него - чистый Python
+                    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+                    config = yaml.load(file, Loader=loader)
+                    modbus_config = config.get("modbus", {})
+                _write_config_sidecar(path, stat, modbus_config)
+
+            _CFG_CACHE[path] = (stat.st_mtime_ns, stat.st_size, modbus_config)
+            if len(_CFG_CACHE) > _CFG_CACHE_SIZE:
+                _CFG_CACHE.popitem(last=False)
+            return copy.deepcopy(modbus_config)
         except FileNotFoundError:
-            print(f"❌ Ошибка: Файл конфигурации {config_file} не найден")
+            log.error("❌ Ошибка: Файл конфигурации %s не найден", config_file)
             raise
         except Exception as e:
-            print(f"❌ Ошибка при загрузке конфигурации: {e}")
+            log.error("❌ Ошибка при загрузке конфигурации: %s", e)
             raise
 
     def connect(self):
         """Установка соединения с сервоприводом"""
         try:
+            for name in _REQUIRED_CONFIG_KEYS:
+                if getattr(self, "_" + name) is None:
+                    raise KeyError(name)
+
             # Создаем объект инструмента Modbus
-            self.instrument = minimalmodbus.Instrument(
-                self.config["port"], self.config["slave_address"]
-            )
+            self.instrument = minimalmodbus.Instrument(self._port, self._slave_address)
 
             # Настраиваем параметры serial порта
-            self.instrument.serial.baudrate = self.config["baudrate"]
-            self.instrument.serial.bytesize = self.config["bytesize"]
-            self.instrument.serial.parity = self.config["parity"]
-            self.instrument.serial.stopbits = self.config["stopbits"]
-            self.instrument.serial.timeout = self.config["timeout"]
-
-            print(
-                f"✅ Успешное подключение к {self.config['port']} на скорости {self.config['baudrate']} baud"
-            )
+            self.instrument.serial.baudrate = self._baudrate
+            self.instrument.serial.bytesize = self._bytesize
+            self.instrument.serial.parity = self._parity
+            self.instrument.serial.stopbits = self._stopbits
+            self.instrument.serial.timeout = self._timeout
+
+            # Кадрирование по длине ответа: читаем ровно ожидаемое число байт
+            # (5 + 2*N для FC3, 8 для FC6), а не ждем истечения таймаута.
+            # Паузу 3.5 символа между кадрами minimalmodbus выдерживает сам.
+            self.instrument.mode = minimalmodbus.MODE_RTU
+            self.instrument.precalculate_read_size = True
+            self.instrument.clear_buffers_before_each_transaction = True
+            self.instrument.close_port_after_each_call = False
+
+            # Набор команд JOG фиксирован - собираем их кадры (с CRC) один раз
+            self._jog_frames = {
+                command: _build_write_frame(self._slave_address, _REG_JOG, command)
+                for command in (_CMD_FORWARD, _CMD_REVERSE, _CMD_STOP)
+            }
+
+            # Запись команд идет в фоновом потоке, чтобы ввод не ждал ответа по шине
+            self._worker = threading.Thread(target=self._io_worker, name="servo-io", daemon=True)
+            self._worker.start()
+
+            log.info("✅ Успешное подключение к %s на скорости %s baud", self._port, self._baudrate)
             return True
 
         except Exception as e:
-            print(f"❌ Не удалось подключиться: {e}")
-            print("Проверьте:")
-            print("- Правильность COM-порта")
-            print("- Скорость передачи (должна быть 9600 для P3-01=1)")
-            print("- Параметр P3-02 должен быть установлен в 7 (Modbus RTU, 8,E,1)")
-            print("- Физическое подключение RS-485")
+            log.error(
+                "❌ Не удалось подключиться: %s\n"
+                "Проверьте:\n"
+                "- Правильность COM-порта\n"
+                "- Скорость передачи (должна быть 9600 для P3-01=1)\n"
+                "- Параметр P3-02 должен быть установлен в 7 (Modbus RTU, 8,E,1)\n"
+                "- Физическое подключение RS-485",
+                e,
+            )
             return False
 
     def check_connection(self):
         """Проверка связи с сервоприводом"""
         try:
-            # Читаем версию прошивки (P0-00)
-            version = self.instrument.read_register(self.REGISTERS["VERSION"], functioncode=3)
-
-            # Читаем код ошибки (P0-01)
-            error_code = self.instrument.read_register(self.REGISTERS["ERROR"], functioncode=3)
+            # Читаем версию прошивки (P0-00) и код ошибки (P0-01) одним запросом:
+            # регистры идут подряд, поэтому достаточно одной транзакции
+            with self._bus_lock:
+                version, error_code = self.instrument.read_registers(
+                    _REG_VERSION, 2, functioncode=3
+                )
 
-            print(f"🔍 Связь установлена!")
-            print(f"   Версия ПО: {version}")
+            log.info("🔍 Связь установлена!\n   Версия ПО: %s", version)
 
             # Проверка кода ошибки
             if error_code == 0:
-                print("✅ Отсутствуют ошибки (код 0)")
+                log.info("✅ Отсутствуют ошибки (код 0)")
             else:
-                print(f"⚠️  Обнаружена ошибка! Код: {error_code}")
-                # Справочная информация по основным кодам ошибок
-                error_descriptions = {
-                    1: "Перегрузка по току",
-                    2: "Перенапряжение",
-                    3: "Пониженное напряжение",
-                    4: "Смещение Z-импульса",
-                    5: "Ошибка рекуперации",
-                    6: "Перегрузка",
-                    7: "Превышение скорости",
-                    8: "Некорректная команда импульсного управления",
-                    9: "Чрезмерное отклонение",
-                    10: "Ошибка watchdog",
-                    13: "Активирован аварийный останов",
-                    14: "Ошибка обратного предела",
-                    15: "Ошибка прямого предела",
-                    20: "Ошибка последовательной связи",
-                    23: "Предупреждение о перегрузке",
-                }
-                description = error_descriptions.get(error_code, "Неизвестная ошибка")
-                print(f"   Описание: {description}")
-                print("   Необходимо устранить ошибку перед управлением")
+                description = self.ERROR_DESCRIPTIONS.get(error_code, "Неизвестная ошибка")
+                log.error(
+                    "⚠️  Обнаружена ошибка! Код: %s\n"
+                    "   Описание: %s\n"
+                    "   Необходимо устранить ошибку перед управлением",
+                    error_code,
+                    description,
+                )
                 return False
 
             return True
 
         except Exception as e:
-            print(f"❌ Ошибка при проверке связи: {e}")
+            log.error("❌ Ошибка при проверке связи: %s", e)
             return False
 
     def initialize_speed(self):
         """Чтение текущей скорости JOG с сервопривода при запуске"""
         try:
             # Читаем текущее значение скорости из регистра P4-05
-            current_speed = self.instrument.read_register(self.REGISTERS["JOG"], functioncode=3)
+            with self._bus_lock:
+                current_speed = self.instrument.read_register(_REG_JOG, functioncode=3)
             # Проверяем, является ли значение корректной скоростью (а не командой движения)
-            if current_speed <= self.JOG_COMMANDS["SPEED_MAX"]:
+            if current_speed <= _SPEED_MAX:
                 self.current_speed = current_speed
-                print(f"📊 Текущая скорость JOG считана из сервопривода: {self.current_speed} об/мин")
+                self._last_written = current_speed
+                log.info("📊 Текущая скорость JOG считана из сервопривода: %s об/мин", current_speed)
             else:
-                print(
-                    f"ℹ️  Текущее значение регистра P4-05 ({current_speed}) не является скоростью. Используется начальное значение 20 об/мин."
+                log.info(
+                    "ℹ️  Текущее значение регистра P4-05 (%s) не является скоростью. "
+                    "Используется начальное значение 20 об/мин.",
+                    current_speed,
                 )
         except Exception as e:
-            print(f"⚠️  Не удалось прочитать текущую скорость: {e}")
-            print("ℹ️  Используется начальное значение скорости (20 об/мин).")
+            log.warning(
+                "⚠️  Не удалось прочитать текущую скорость: %s\n"
+                "ℹ️  Используется начальное значение скорости (20 об/мин).",
+                e,
+            )
 
     def set_jog_speed(self, speed):
         """Установка скорости для режима JOG с применением на лету"""
-        try:
-            # Проверка диапазона скорости
-            if speed < self.JOG_COMMANDS["SPEED_MIN"]:
-                speed = self.JOG_COMMANDS["SPEED_MIN"]
-            elif speed > self.JOG_COMMANDS["SPEED_MAX"]:
-                speed = self.JOG_COMMANDS["SPEED_MAX"]
-
-            # Записываем скорость в регистр P4-05
-            self.instrument.write_register(self.REGISTERS["JOG"], speed, functioncode=6)
-            self.current_speed = speed
-
-            # Если мотор в движении, продолжаем движение в том же направлении
-            if self.current_direction == "forward":
-                self.jog(self.JOG_COMMANDS["FORWARD"])
-            elif self.current_direction == "reverse":
-                self.jog(self.JOG_COMMANDS["REVERSE"])
-
-            print(f"🎯 Скорость установлена: {speed} об/мин")
-            return True
-        except Exception as e:
-            print(f"❌ Ошибка при установке скорости JOG: {e}")
-            return False
+        # Проверка диапазона скорости
+        if speed < _SPEED_MIN:
+            speed = _SPEED_MIN
+        elif speed > _SPEED_MAX:
+            speed = _SPEED_MAX
+
+        # Кадр собираем здесь, пока фоновый поток занят предыдущим обменом.
+        # Запишет скорость он же, причем только последнюю из серии нажатий +/-
+        # без команд направления между ними - серия превращается в одну транзакцию.
+        # Направление запоминаем на момент запроса: UI опережает шину
+        self.current_speed = speed
+        frame = self._frame_for(speed)
+        with self._pending_lock:
+            request = self._pending_speed
+            if request is not None:
+                request[:] = (speed, frame, self.current_direction)
+                return True
+            request = self._pending_speed = [speed, frame, self.current_direction]
+        self._cmd_q.put((_FLUSH_SPEED, request))
+        return True
 
     def increase_speed(self, increment=JOG_STEP):
         """Увеличение скорости JOG на указанную величину"""
@@ -171,54 +388,241 @@ class ServoController:
         new_speed = self.current_speed - decrement
         return self.set_jog_speed(new_speed)
 
-    def jog(self, command):
-        """Управление режимом JOG с отслеживанием направления"""
+    def _send_raw(self, frame, expected_len=8):
+        """Отправка готового RTU-кадра записи (FC6) и проверка эха в ответе"""
+        # _communicate сам выдерживает паузу 3.5 символа и очищает буферы порта.
+        # Метод внутренний - версия minimalmodbus закреплена в requirements.txt
+        response = self.instrument._communicate(frame, expected_len)
+        if len(response) >= 3 and response[1] & 0x80:
+            # Привод ответил исключением: функция | 0x80 и код ошибки
+            code = response[2]
+            error, description = _SLAVE_EXCEPTIONS.get(
+                code, (minimalmodbus.SlaveReportedException, "неизвестная ошибка")
+            )
+            raise error(f"Привод отклонил запись: {description} (код исключения {code})")
+        if response != frame:
+            raise minimalmodbus.InvalidResponseError(
+                f"Неожиданный ответ на запись: {response.hex(' ')} (ожидалось {frame.hex(' ')})"
+            )
+
+    def _frame_for(self, value):
+        """RTU-кадр записи значения в регистр P4-05"""
+        frame = self._jog_frames.get(value)
+        if frame is None:
+            # Скорость - переменное значение, собираем кадр с CRC по таблице
+            frame = _build_write_frame(self._slave_address, _REG_JOG, value)
+        return frame
+
+    def _write_jog(self, value, frame):
+        """Запись скорости или команды в регистр P4-05 без повторной записи той же скорости"""
+        # Пропускаем только повтор скорости. Команды STOP и направления отправляем
+        # всегда: мотор мог быть запущен или остановлен в обход программы
+        if value <= _SPEED_MAX and value == self._last_written:
+            return
+        try:
+            self._send_raw(frame)
+        except Exception:
+            # Состояние регистра после сбоя неизвестно - следующую запись не пропускаем
+            self._last_written = None
+            raise
+        self._last_written = value
+
+    def _flush_pending(self, request):
+        """Запись последней скорости из заявки (выполняется в фоновом потоке)"""
+        with self._pending_lock:
+            speed, frame, direction = request
+            # Заявка записывается - следующие изменения скорости встанут в очередь заново
+            if self._pending_speed is request:
+                self._pending_speed = None
+        self._apply_speed(speed, frame, direction)
+
+    def _apply_speed(self, speed, frame, direction):
+        """Запись скорости в привод (выполняется в фоновом потоке)"""
         try:
-            # Записываем команду в регистр P4-05
-            self.instrument.write_register(self.REGISTERS["JOG"], command, functioncode=6)
+            self._write_jog(speed, frame)
 
-            # Обновляем текущее направление движения
-            if command == self.JOG_COMMANDS["FORWARD"]:
-                self.current_direction = "forward"
-            elif command == self.JOG_COMMANDS["REVERSE"]:
-                self.current_direction = "reverse"
-            elif command == self.JOG_COMMANDS["STOP"]:
-                self.current_direction = None
+            # Если мотор в движении, продолжаем движение в том же направлении.
+            # Прошивки, применяющие новую скорость на ходу, этого не требуют -
+            # тогда resume_jog_after_speed: false экономит одну транзакцию
+            if self._resume_jog and direction is not Direction.STOP:
+                command = self.DIRECTION_COMMANDS[direction]
+                self._write_jog(command, self._jog_frames[command])
 
-            return True
+            log.info("🎯 Скорость установлена: %s об/мин", speed)
         except Exception as e:
-            print(f"❌ Ошибка при отправке JOG команды: {e}")
-            return False
+            log.error("❌ Ошибка при установке скорости JOG: %s", e)
+
+    def _apply_jog(self, command, frame):
+        """Отправка команды JOG в привод (выполняется в фоновом потоке)"""
+        try:
+            self._write_jog(command, frame)
+        except Exception as e:
+            log.error("❌ Ошибка при отправке JOG команды: %s", e)
+
+    def _io_worker(self):
+        """Фоновый поток обмена: отправляет готовые кадры из очереди по порядку"""
+        while True:
+            item = self._cmd_q.get()
+            if item is None:  # Сигнал завершения от close()
+                return
+            with self._bus_lock:
+                if item[0] is _FLUSH_SPEED:
+                    self._flush_pending(item[1])
+                else:
+                    self._apply_jog(*item)
+
+    def jog(self, command):
+        """Управление режимом JOG с отслеживанием направления"""
+        # Обновляем текущее направление движения
+        self.current_direction = self.COMMAND_DIRECTIONS.get(command, self.current_direction)
+
+        # Команда - граница для объединения скоростей: изменения скорости после нее
+        # не должны попасть в заявку, стоящую в очереди перед ней
+        with self._pending_lock:
+            self._pending_speed = None
+
+        # Запись команды в регистр P4-05 выполнит фоновый поток
+        self._cmd_q.put((command, self._frame_for(command)))
+        return True
 
     def stop_jog(self):
         """Остановка вращения в режиме JOG"""
-        self.current_direction = None
-        return self.jog(self.JOG_COMMANDS["STOP"])
+        self.current_direction = Direction.STOP
+        return self.jog(_CMD_STOP)
 
     def reset_speed_to_initial(self):
         """Сброс скорости до начального значения"""
-        try:
-            self.set_jog_speed(20)  # Сбрасываем до 20 об/мин
-            print("🔄 Скорость сброшена до начального значения (20 об/мин)")
-            return True
-        except Exception as e:
-            print(f"❌ Не удалось сбросить скорость: {e}")
-            return False
+        # Запишет скорость фоновый поток, он же сообщит о результате
+        return self.set_jog_speed(20)  # Сбрасываем до 20 об/мин
 
     def close(self):
         """Закрытие соединения"""
-        if self.instrument:
-            self.stop_jog()
-            # Сбрасываем скорость до начального значения перед закрытием
-            self.reset_speed_to_initial()
-            print("⏹️  Остановлено и соединение закрыто")
+        # Без фонового потока отправлять команды некому: соединения нет или оно уже закрыто
+        if self._worker is None:
+            return
+
+        self.stop_jog()
+        # Сбрасываем скорость до начального значения перед закрытием
+        self.reset_speed_to_initial()
+        # Дожидаемся, пока фоновый поток отправит остановку и сброс скорости
+        self._cmd_q.put(None)
+        self._worker.join()
+        self._worker = None
+
+        self.instrument.serial.close()
+        self.instrument = None
+        log.info("⏹️  Остановлено и соединение закрыто")
+
+
+# Значения из таблиц класса, нужные на каждом обмене, - константами модуля,
+# чтобы не искать их в словарях при каждом вызове
+_REG_VERSION = ServoController.REGISTERS["VERSION"]
+_REG_JOG = ServoController.REGISTERS["JOG"]
+_CMD_FORWARD = ServoController.JOG_COMMANDS["FORWARD"]
+_CMD_REVERSE = ServoController.JOG_COMMANDS["REVERSE"]
+_CMD_STOP = ServoController.JOG_COMMANDS["STOP"]
+_SPEED_MIN = ServoController.JOG_COMMANDS["SPEED_MIN"]
+_SPEED_MAX = ServoController.JOG_COMMANDS["SPEED_MAX"]
+
+
+# Клавиши, прочитанные одним системным вызовом, но еще не обработанные
+_PENDING_KEYS = deque()
+
+
+@contextmanager
+def _cbreak_terminal():
+    """Перевод терминала в посимвольный режим (без Enter и эха) на время управления"""
+    if msvcrt is not None or not sys.stdin.isatty():
+        yield
+        return
+
+    fd = sys.stdin.fileno()
+    old_attrs = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        yield
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_attrs)
+
+
+def _getch(timeout=None):
+    """Чтение одной нажатой клавиши без ожидания Enter.
+
+    Возвращает None, если за timeout секунд ничего не нажато или нажата служебная
+    клавиша (стрелки, F1-F12 и т.п.), и "" при закрытии ввода.
+    """
+    if _PENDING_KEYS:
+        return _PENDING_KEYS.popleft()
+
+    if msvcrt is not None:
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while not msvcrt.kbhit():
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.01)
+        key = msvcrt.getwch()
+        if key == "\x03":  # Ctrl+C не порождает KeyboardInterrupt в getwch()
+            raise KeyboardInterrupt
+        if key in ("\x00", "\xe0"):
+            # Служебная клавиша: второй символ - ее код (Delete дает "S"), а не команда
+            msvcrt.getwch()
+            return None
+        return key
+
+    fd = sys.stdin.fileno()
+    if not select.select([fd], [], [], timeout)[0]:
+        return None
+    # Читаем все, что уже пришло: зажатая клавиша или многобайтовый символ
+    data = os.read(fd, 32)
+    if not data:
+        return ""
+    keys = data.decode(errors="ignore")
+    # Служебные клавиши приходят escape-последовательностями (F4 - ESC O S):
+    # их символы не команды, отбрасываем последовательность целиком
+    escape = keys.find("\x1b")
+    if escape != -1:
+        keys = keys[:escape]
+    _PENDING_KEYS.extend(keys)
+    return _PENDING_KEYS.popleft() if _PENDING_KEYS else None
+
+
+# Постоянные строки интерфейса собираются один раз при загрузке модуля
+_RULE = "=" * 50
+_MENU = "\n".join(
+    (
+        "Управление (клавиши действуют сразу, без Enter):",
+        "  w - Вращение вперед (CW)",
+        "  s - Вращение назад (CCW)",
+        "  пробел - Остановить вращение",
+        f"  + - Увеличить скорость на {JOG_STEP} об/мин",
+        f"  - - Уменьшить скорость на {JOG_STEP} об/мин",
+        "  q - Выход из программы",
+        _RULE,
+    )
+)
+_MSG_STOPPED = "⏹️  Остановлено"
+_MSG_UNKNOWN = "❌ Неизвестная команда. Используйте w, s, пробел, +, - или q."
+_MSG_EXIT = "\n👋 Выход из программы..."
+
+
+def _say(*lines):
+    """Вывод строк интерфейса одной записью в stdout"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def main():
     """Основная функция управления"""
-    print("=" * 50)
-    print("Delta ASDA-AB Servo Controller - JOG Mode")
-    print("=" * 50)
+    # Диагностика контроллера идет через logging: SERVO_LOG=INFO покажет ход обмена
+    level_name = os.environ.get("SERVO_LOG", "WARNING").upper()
+    level = getattr(logging, level_name, None)
+    logging.basicConfig(
+        level=level if isinstance(level, int) else logging.WARNING, format="%(message)s"
+    )
+    if not isinstance(level, int):
+        log.warning("⚠️  Неизвестный уровень SERVO_LOG=%s, используется WARNING", level_name)
+    _say(_RULE, "Delta ASDA-AB Servo Controller - JOG Mode", _RULE)
 
     # Инициализация контроллера
     controller = ServoController()
@@ -235,55 +639,51 @@ def main():
     # Инициализация скорости при запуске
     controller.initialize_speed()
 
-    print("\n" + "=" * 50)
-    print("✅ Готов к управлению!")
-    print(f"Текущая скорость: {controller.current_speed} об/мин")
-    print("Управление:")
-    print("  w - Вращение вперед (CW)")
-    print("  s - Вращение назад (CCW)")
-    print("  пробел - Остановить вращение")
-    print(f"  + - Увеличить скорость на {JOG_STEP} об/мин")
-    print(f"  - - Уменьшить скорость на {JOG_STEP} об/мин")
-    print("  q - Выход из программы")
-    print("=" * 50)
+    _say(
+        "\n" + _RULE,
+        "✅ Готов к управлению!",
+        f"Текущая скорость: {controller.current_speed} об/мин",
+        _MENU,
+    )
 
     try:
-        while True:
-            # Ожидание команды пользователя
-            command = input("Введите команду: ").strip().lower()
+        with _cbreak_terminal():
+            while True:
+                # Ожидание нажатия клавиши
+                command = _getch()
+                if command is None:
+                    continue
+                command = command.lower()
 
-            if command == "w":
-                controller.jog(controller.JOG_COMMANDS["FORWARD"])
-                print(f"➡️  Вращение ВПЕРЕД ({controller.current_speed} об/мин)")
+                if command == "w":
+                    controller.jog(_CMD_FORWARD)
+                    _say(f"➡️  Вращение ВПЕРЕД ({controller.current_speed} об/мин)")
 
-            elif command == "s":
-                controller.jog(controller.JOG_COMMANDS["REVERSE"])
-                print(f"⬅️  Вращение НАЗАД ({controller.current_speed} об/мин)")
+                elif command == "s":
+                    controller.jog(_CMD_REVERSE)
+                    _say(f"⬅️  Вращение НАЗАД ({controller.current_speed} об/мин)")
 
-            elif command == " " or command == "":
-                controller.stop_jog()
-                print("⏹️  Остановлено")
+                elif command in (" ", "\r", "\n"):
+                    controller.stop_jog()
+                    _say(_MSG_STOPPED)
 
-            elif command == "+":
-                controller.increase_speed(JOG_STEP)
-                print(f"📈 Скорость увеличена: {controller.current_speed} об/мин")
+                elif command == "+":
+                    controller.increase_speed(JOG_STEP)
+                    _say(f"📈 Скорость увеличена: {controller.current_speed} об/мин")
 
-            elif command == "-":
-                controller.decrease_speed(JOG_STEP)
-                print(f"📉 Скорость уменьшена: {controller.current_speed} об/мин")
+                elif command == "-":
+                    controller.decrease_speed(JOG_STEP)
+                    _say(f"📉 Скорость уменьшена: {controller.current_speed} об/мин")
 
-            elif command == "q":
-                print("\n👋 Выход из программы...")
-                break
-
-            else:
-                print("❌ Неизвестная команда. Используйте w, s, пробел, +, - или q.")
+                elif command in ("q", ""):  # "" - ввод закрыт
+                    _say(_MSG_EXIT)
+                    break
 
-            # Небольшая задержка для плавной работы
-            time.sleep(0.1)
+                else:
+                    _say(_MSG_UNKNOWN)
 
     except KeyboardInterrupt:
-        print("\n⚠️  Программа прервана пользователем")
+        _say("\n⚠️  Программа прервана пользователем")
 
     finally:
         # Сбрасываем скорость до начального значения перед выходом